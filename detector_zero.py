@@ -16,6 +16,25 @@ ___  ____  _____   ____  _____ ____ _ __ _____
       . NO: Normally Open when No power exists
     . This project uses Normally Closed relays to trigger a button press.
 
+  Updated 10/14/2026 -- Ken C. Soukup
+    . Version bump: 1.6
+    . Collapsed the per-relay callbacks into a single table-driven handler
+    . Relay inputs read from the GPIO character device (gpiod) in one epoll loop
+    . SNS alerts are fire-and-forget, queued and sent by a worker thread with PublishBatch
+    . boto3 is imported and the SNS client created once, on the first alert
+    . Event timestamps built from time.time_ns(), seconds part formatted once per second
+    . Log purge walks the directory with os.scandir, banner prints once
+    . Log files are line buffered, replaces the functools print/flush wrapper
+    . Relay event log lines use a template prebuilt per relay, written with os.write
+    . Runtime log lines from every thread go through write_line, one os.write per line
+    . Per-relay state moved into a slotted Relay dataclass
+    . Added DEBOUNCE_MS relay debounce, done in the kernel (gpiod debounce_period)
+    . Relay closure must hold for HOLD_MS before it is a Failure, same as Button.when_held
+    . LEDs driven through one gpiod output request, gpiozero no longer needed
+    . Relay state changes decoded through a (last, current) transition table
+    . Line offset -> Relay and edge type -> pin state tables built once at load
+    . Startup reads every relay in one bulk read and sets all LEDs in one write
+
   Updated 03/29/2021 -- Ken C. Soukup
     . Version bump: 1.5
     . Added Relay Enable/Disable for unused ports
@@ -46,7 +65,7 @@ ___  ____  _____   ____  _____ ____ _ __ _____
 
 """
 __project__ = 'Vigorous Power Detector'
-__version__ = '1.4'
+__version__ = '1.6'
 __author__ = 'Ken C. Soukup'
 __company__ = 'Vigorous Programming'
 __minted__ = '2021'
@@ -54,13 +73,16 @@ __minted__ = '2021'
 import os
 import sys
 import time
-import signal
+import select
+import queue
 import socket
+import itertools
+import threading
 import functools
-from datetime import datetime
-import boto3
-from gpiozero import Button
-from gpiozero import LED
+from datetime import timedelta
+from dataclasses import dataclass, field
+import gpiod
+from gpiod.line import Bias, Direction, Edge, Value
 
 # Global Constants
 BASENAME = os.path.basename(__file__)[0:-3]
@@ -69,11 +91,15 @@ LOG_PATH = os.path.join(os.getcwd(), 'log')
 ETC_PATH = os.path.join(os.getcwd(), 'etc')
 LOG_FILE = os.path.join(LOG_PATH, BASENAME + '_' + FILE_DT + '.log')
 ERR_FILE = os.path.join(LOG_PATH, BASENAME + '_' + FILE_DT + '.err')
+TIME_FMT = '%Y-%m-%d %H:%M:%S'
 HOSTNAME = socket.gethostname()
 ENVIRONMENT = 'dev'
 USE_LOG = False
-RETENTION_DAYS = '180'
+RETENTION_DAYS = 180
 LOG_GHOSTS = False
+DEBOUNCE_MS = 50
+HOLD_MS = 1000  # Relay must stay closed this long to count as Power Off (gpiozero hold_time)
+HOLD_NS = HOLD_MS * 1000000
 
 # AWS Variables
 AWS_ACCOUNT_ID = '<GET_YOUR_OWN_AWS_ACCOUNT>'
@@ -81,36 +107,83 @@ SNS_ENABLE = True
 TOPIC_NAME = 'VigorousPowerDetector'
 TOPIC_ARN = 'arn:aws:sns:us-east-2:' + AWS_ACCOUNT_ID + ':' + TOPIC_NAME
 PROFILE_NAME = 'Starlight'
+SNS_BATCH_SIZE = 10  # PublishBatch maximum
+SNS_BATCH_WAIT = 0.5  # Seconds to let an alert burst collect before sending
+SNS_DRAIN_WAIT = 10  # Seconds to wait at exit for queued alerts to be sent
+
+# GPIO Character Device for relay inputs and LEDs
+GPIO_CHIP = '/dev/gpiochip0'
 
 # Relay 1 Configs / BCM Pin Numbers
 R1_ENABLED = True
-R1_RELAY = Button(25)
-R1_RED_LED = LED(17)
-R1_RED_LED.off()
-R1_GREEN_LED = LED(4)
-R1_GREEN_LED.off()
+R1_PIN = 25
+R1_RED_PIN = 17
+R1_GREEN_PIN = 4
 R1_NAME = 'Sump Pump Relay'
-R1_LAST_STATE = 2
 
 # Relay 2 Configs / BCM Pin Numbers
 R2_ENABLED = True
-R2_RELAY = Button(5)
-R2_RED_LED = LED(27)
-R2_RED_LED.off()
-R2_GREEN_LED = LED(18)
-R2_GREEN_LED.off()
+R2_PIN = 5
+R2_RED_PIN = 27
+R2_GREEN_PIN = 18
 R2_NAME = 'Small Fridge Relay'
-R2_LAST_STATE = 2
 
 # Relay 3 Configs / BCM Pin Numbers
 R3_ENABLED = False
-R3_RELAY = Button(6)
-R3_RED_LED = LED(23)
-R3_RED_LED.off()
-R3_GREEN_LED = LED(22)
-R3_GREEN_LED.off()
+R3_PIN = 6
+R3_RED_PIN = 23
+R3_GREEN_PIN = 22
 R3_NAME = 'Garage Fridge Relay'
-R3_LAST_STATE = 2
+
+
+@dataclass(slots=True)
+class Relay:
+    """ Relay config plus its runtime state (last: 2 = not yet sampled,
+        hold_until: monotonic ns deadline of a pending closure hold, 0 = none). """
+    name: str
+    enabled: bool
+    pin: int
+    red_pin: int
+    green_pin: int
+    last: int = 2
+    hold_until: int = 0
+    tmpl: str = field(init=False)
+    leds: dict = field(init=False)
+
+    def __post_init__(self):
+        # Log line with name/hostname/environment baked in once;
+        # fields left open: flag, event time, status, description, pin state
+        self.tmpl = ('%s %s, %s, ' + f'{self.name}, '.replace('%', '%%') +
+                     '%s, Pin State = %s, ' + f'{HOSTNAME}, {ENVIRONMENT}'.replace('%', '%%') + '\n')
+        # Pin State -> LED values, red when Power is Off, green when Power is On
+        self.leds = {
+            1: {self.red_pin: Value.ACTIVE, self.green_pin: Value.INACTIVE},
+            0: {self.red_pin: Value.INACTIVE, self.green_pin: Value.ACTIVE},
+        }
+
+
+# Relay Table
+RELAYS = [
+    Relay(R1_NAME, R1_ENABLED, R1_PIN, R1_RED_PIN, R1_GREEN_PIN),
+    Relay(R2_NAME, R2_ENABLED, R2_PIN, R2_RED_PIN, R2_GREEN_PIN),
+    Relay(R3_NAME, R3_ENABLED, R3_PIN, R3_RED_PIN, R3_GREEN_PIN),
+]
+
+# Lookup Tables, fixed after load so the event loop never branches on which relay fired
+_BY_OFFSET = {rec.pin: rec for rec in RELAYS if rec.enabled}
+_LED_PINS = tuple(pin for rec in RELAYS for pin in (rec.red_pin, rec.green_pin))
+_EDGE_STATE = {gpiod.EdgeEvent.Type.RISING_EDGE: 1, gpiod.EdgeEvent.Type.FALLING_EDGE: 0}
+
+# SNS Alert Queue, drained by _sns_worker
+_sns_queue = queue.Queue()
+_SNS_STOP = None  # Sentinel, worker sends what it holds then exits
+_sns_ids = itertools.count()
+
+# Pin State -> description, 1 means the relay closed, 0 means it opened
+DESCRIPTIONS = {
+    1: 'Power is Off',
+    0: 'Power is On',
+}
 
 
 def main():
@@ -118,7 +191,7 @@ def main():
     print (f'\n {__project__} v{__version__}')
     print (f' {__company__}')
     print (f' Crafted by {__author__} ({__minted__})\n')
-    start_time = time.time()
+    start_time = time.monotonic()
 
     header('Runtime Environment')
     print(f'[+] Hostnane          : {HOSTNAME}')
@@ -126,16 +199,15 @@ def main():
     print(f'[+] Script Name       : {BASENAME}')
     print(f'[+] Logging Enabled   : {USE_LOG}')
     print(f'[+] Retention Days    : {RETENTION_DAYS}')
+    print(f'[+] Debounce (ms)     : {DEBOUNCE_MS}')
+    print(f'[+] Hold Time (ms)    : {HOLD_MS}')
     print(f'[+] Log Directory     : {LOG_PATH}')
     print(f'[+] AWS User Id       : {PROFILE_NAME}')
     print(f'[+] SNS Topic Name    : {TOPIC_NAME}')
     print(f'[+] SNS Push Enabled  : {SNS_ENABLE}')
-    print(f'[+] Relay 1 Name      : {R1_NAME}')
-    print(f'[+] Relay 1 Enabled   : {R1_ENABLED}')
-    print(f'[+] Relay 2 Name      : {R2_NAME}')
-    print(f'[+] Relay 2 Enabled   : {R2_ENABLED}')
-    print(f'[+] Relay 3 Name      : {R3_NAME}')
-    print(f'[+] Relay 3 Enabled   : {R3_ENABLED}')
+    for num, rec in enumerate(RELAYS, 1):
+        print(f'[+] Relay {num} Name      : {rec.name}')
+        print(f'[+] Relay {num} Enabled   : {rec.enabled}')
     print()
 
     header('NOTICE')
@@ -146,196 +218,155 @@ def main():
     print()
 
     header('System Status')
-    if R1_ENABLED:
-        print(f'[+] Checking {R1_NAME} for current state...')
-        r1_gpio_event_detected(R1_RELAY)
-        # Attach callbacks for trigger events
-        R1_RELAY.when_held = r1_gpio_event_detected
-        R1_RELAY.when_released = r1_gpio_event_detected
-
-    if R2_ENABLED:
-        print(f'[+] Checking {R2_NAME} for current state...')
-        r2_gpio_event_detected(R2_RELAY)
-        # Attach callbacks for trigger events
-        R2_RELAY.when_held = r2_gpio_event_detected
-        R2_RELAY.when_released = r2_gpio_event_detected
-
-    if R3_ENABLED:
-        print(f'[+] Checking {R3_NAME} for current state...')
-        r3_gpio_event_detected(R3_RELAY)
-        # Attach callbacks for trigger events
-        R3_RELAY.when_held = r3_gpio_event_detected
-        R3_RELAY.when_released = r3_gpio_event_detected
+    if not _BY_OFFSET:
+        # gpiod refuses an empty line request, nothing to watch so stop here
+        print('[-] No relays are enabled (R1/R2/R3_ENABLED), nothing to monitor, exiting...')
+        return
+
+    sns_thread = None
+    if SNS_ENABLE:
+        sns_thread = threading.Thread(target=_sns_worker, name='sns', daemon=True)
+        sns_thread.start()
+
+    # Pulled up and active low, same as a gpiozero Button: closed relay reads 1.
+    # The kernel debounces the lines, contact bounce never reaches Python.
+    settings = gpiod.LineSettings(edge_detection=Edge.BOTH, bias=Bias.PULL_UP, active_low=True,
+                                  debounce_period=timedelta(milliseconds=DEBOUNCE_MS))
+    request = gpiod.request_lines(GPIO_CHIP, consumer=BASENAME,
+                                  config={tuple(_BY_OFFSET): settings})
+    # All LEDs in one output request, each event updates a relay's pair in one write
+    leds = gpiod.request_lines(GPIO_CHIP, consumer=BASENAME, config={
+        _LED_PINS: gpiod.LineSettings(direction=Direction.OUTPUT, output_value=Value.INACTIVE)})
+    # One bulk read samples every relay, one write sets all of their LEDs
+    write_line('[+] Checking relays for current state...\n')
+    event_time = event_stamp()
+    led_values = {}
+    for rec, value in zip(_BY_OFFSET.values(), request.get_values()):
+        rec.last = value.value
+        led_values.update(rec.leds[rec.last])
+        write_line(rec.tmpl % ('[+]', event_time, 'Script Initializing', DESCRIPTIONS[rec.last], rec.last))
+    leds.set_values(led_values)
 
     try:
-        print()
+        write_line('\n')
         header('Monitoring')
-        # input('[+] Press ENTER or CTRL-C to terminate script.\n')  # This is for Windows
-        signal.pause()  # This is for Linux
+        # One epoll wait on the line request fd serves every relay
+        poller = select.epoll()
+        poller.register(request.fd, select.EPOLLIN)
+        while True:
+            # Block until an edge, or until the earliest pending closure hold expires
+            pending = [rec for rec in _BY_OFFSET.values() if rec.hold_until]
+            timeout = None
+            if pending:
+                timeout = max(min(rec.hold_until for rec in pending) - time.monotonic_ns(), 0) / 1e9
+            if poller.poll(timeout):
+                for event in request.read_edge_events():
+                    _on_edge(_BY_OFFSET[event.line_offset], _EDGE_STATE[event.event_type], leds)
+            now = time.monotonic_ns()
+            for rec in pending:
+                if rec.hold_until and rec.hold_until <= now:
+                    # Stayed closed for HOLD_MS, this is a real outage
+                    rec.hold_until = 0
+                    _on_event(rec, 1, leds)
     except KeyboardInterrupt:
-        event_time = str(datetime.now().isoformat()).replace('T', ' ')
-        print(f'[!] {event_time}, CTRL-C interrupt detected, terminating script...')
+        event_time = event_stamp()
+        write_line(f'[!] {event_time}, CTRL-C interrupt detected, terminating script...\n')
     except Exception as ex:
-        event_time = str(datetime.now().isoformat()).replace('T', ' ')
-        print(f'[!] {event_time}, Exception trapped: {ex}')
+        event_time = event_stamp()
+        write_line(f'[!] {event_time}, Exception trapped: {ex}\n')
     finally:
         header('Cleaning up GPIO and exiting...')
-        R1_RELAY.close()
-        R2_RELAY.close()
-        R3_RELAY.close()
-        R1_RED_LED.close()
-        R2_RED_LED.close()
-        R1_GREEN_LED.close()
-        R2_GREEN_LED.close()
+        request.release()
+        leds.release()
+        if sns_thread is not None:
+            # Flush alerts already queued, the worker would otherwise die with the process
+            _sns_queue.put_nowait(_SNS_STOP)
+            sns_thread.join(timeout=SNS_DRAIN_WAIT)
+            if sns_thread.is_alive():
+                write_line(f'[-] {event_stamp()}, SNS worker did not finish within {SNS_DRAIN_WAIT} secs, '
+                           f'queued alerts may not have been sent\n')
 
     # Close Script
-    script_run_time = (time.time()) - (start_time)
-    print('\nElapsed Time : {0:02d} hrs. {1:02d} mins. {2:02d} secs. {3:06d} ms.'.format(
+    script_run_time = (time.monotonic()) - (start_time)
+    write_line('\nElapsed Time : {0:02d} hrs. {1:02d} mins. {2:02d} secs. {3:06d} ms.\n'.format(
         int(script_run_time / 3600), (int(script_run_time / 60) % 60),
         int(script_run_time % 60), int((script_run_time * 1000) % 1000)))
-    print('Mission Complete!!')
+    write_line('Mission Complete!!\n')
 
 
-def r1_gpio_event_detected(channel):
-    """ GPIO Event Detected, reviewing pin state and processing outcome. """
-    # Relay 1 Handling
-    global R1_LAST_STATE
-    r1_state = channel.value
-    event_time = str(datetime.now().isoformat()).replace('T', ' ')
-    if r1_state == 1:
-        # Check last state to be sure this is a true event
-        description = 'Power is Off'
-        R1_GREEN_LED.off()
-        R1_RED_LED.on()
-        if R1_LAST_STATE == 0:
-            # header(R1_NAME)
-            status = 'Failure'
-            print(f'[!] {event_time}, {status}, {R1_NAME}, {description}, Pin State = {r1_state}, {HOSTNAME}, {ENVIRONMENT}')
-            publish_sns_alert(event_time, R1_NAME, status, description, r1_state)
-            R1_LAST_STATE = r1_state
-        elif R1_LAST_STATE == 1 and LOG_GHOSTS:
-            status = 'Ghost Trigger'
-            print(f'[-] {event_time}, {status}, {R1_NAME}, {description}, Pin State = {r1_state}, {HOSTNAME}, {ENVIRONMENT}')
-        elif R1_LAST_STATE == 2:
-            status = 'Script Initializing'
-            print(f'[+] {event_time}, {status}, {R1_NAME}, {description}, Pin State = {r1_state}, {HOSTNAME}, {ENVIRONMENT}')
-            R1_LAST_STATE = r1_state
-    if r1_state == 0:
-        # Check last state to be sure this is a true event
-        description = 'Power is On'
-        R1_RED_LED.off()
-        R1_GREEN_LED.on()
-        if R1_LAST_STATE == 1:
-            # header(R1_NAME)
-            status = 'Success'
-            print(f'[+] {event_time}, {status}, {R1_NAME}, {description}, Pin State = {r1_state}, {HOSTNAME}, {ENVIRONMENT}')
-            publish_sns_alert(event_time, R1_NAME, status, description, r1_state)
-            R1_LAST_STATE = r1_state
-        elif R1_LAST_STATE == 0 and LOG_GHOSTS:
-            status = 'Ghost Trigger'
-            print(f'[-] {event_time}, {status}, {R1_NAME}, {description}, Pin State = {r1_state}, {HOSTNAME}, {ENVIRONMENT}')
-        elif R1_LAST_STATE == 2:
-            status = 'Script Initializing'
-            print(f'[+] {event_time}, {status}, {R1_NAME}, {description}, Pin State = {r1_state}, {HOSTNAME}, {ENVIRONMENT}')
-            R1_LAST_STATE = r1_state
-
-
-def r2_gpio_event_detected(channel):
-    """ GPIO Event Detected, reviewing pin state and processing outcome. """
-    # Relay 2 Handling
-    global R2_LAST_STATE
-    r2_state = channel.value
-    event_time = str(datetime.now().isoformat()).replace('T', ' ')
-    if r2_state == 1:
-        # Check last state to be sure this is a true event
-        description = 'Power is Off'
-        R2_GREEN_LED.off()
-        R2_RED_LED.on()
-        if R2_LAST_STATE == 0:
-            # header(R2_NAME)
-            status = 'Failure'
-            print(f'[!] {event_time}, {status}, {R2_NAME}, {description}, Pin State = {r2_state}, {HOSTNAME}, {ENVIRONMENT}')
-            publish_sns_alert(event_time, R2_NAME, status, description, r2_state)
-            R2_LAST_STATE = r2_state
-        elif R2_LAST_STATE == 1 and LOG_GHOSTS:
-            status = 'Ghost Trigger'
-            print(f'[-] {event_time}, {status}, {R2_NAME}, {description}, Pin State = {r2_state}, {HOSTNAME}, {ENVIRONMENT}')
-        elif R2_LAST_STATE == 2:
-            status = 'Script Initializing'
-            print(f'[+] {event_time}, {status}, {R2_NAME}, {description}, Pin State = {r2_state}, {HOSTNAME}, {ENVIRONMENT}')
-            R2_LAST_STATE = r2_state
-    if r2_state == 0:
-        # Check last state to be sure this is a true event
-        description = 'Power is On'
-        R2_RED_LED.off()
-        R2_GREEN_LED.on()
-        if R2_LAST_STATE == 1:
-            # header(R2_NAME)
-            status = 'Success'
-            print(f'[+] {event_time}, {status}, {R2_NAME}, {description}, Pin State = {r2_state}, {HOSTNAME}, {ENVIRONMENT}')
-            publish_sns_alert(event_time, R2_NAME, status, description, r2_state)
-            R2_LAST_STATE = r2_state
-        elif R2_LAST_STATE == 0 and LOG_GHOSTS:
-            status = 'Ghost Trigger'
-            print(f'[-] {event_time}, {status}, {R2_NAME}, {description}, Pin State = {r2_state}, {HOSTNAME}, {ENVIRONMENT}')
-        elif R2_LAST_STATE == 2:
-            status = 'Script Initializing'
-            print(f'[+] {event_time}, {status}, {R2_NAME}, {description}, Pin State = {r2_state}, {HOSTNAME}, {ENVIRONMENT}')
-            R2_LAST_STATE = r2_state
-
-
-def r3_gpio_event_detected(channel):
+def _on_edge(rec, state, leds):
+    """ Edge from the epoll loop, a closing relay only counts once it has held for HOLD_MS. """
+    if state == 1 and rec.last == 0:
+        if not rec.hold_until:
+            rec.hold_until = time.monotonic_ns() + HOLD_NS
+        return
+    # Opened again before the hold expired, a blip and not an outage
+    rec.hold_until = 0
+    _on_event(rec, state, leds)
+
+
+def _on_event(rec, state, leds):
     """ GPIO Event Detected, reviewing pin state and processing outcome. """
-    # Relay 2 Handling
-    global R3_LAST_STATE
-    r3_state = channel.value
-    event_time = str(datetime.now().isoformat()).replace('T', ' ')
-    if r3_state == 1:
-        # Check last state to be sure this is a true event
-        description = 'Power is Off'
-        R3_GREEN_LED.off()
-        R3_RED_LED.on()
-        if R3_LAST_STATE == 0:
-            # header(R3_NAME)
-            status = 'Failure'
-            print(f'[!] {event_time}, {status}, {R3_NAME}, {description}, Pin State = {r3_state}, {HOSTNAME}, {ENVIRONMENT}')
-            publish_sns_alert(event_time, R3_NAME, status, description, r3_state)
-            R3_LAST_STATE = r3_state
-        elif R3_LAST_STATE == 1 and LOG_GHOSTS:
-            status = 'Ghost Trigger'
-            print(f'[-] {event_time}, {status}, {R3_NAME}, {description}, Pin State = {r3_state}, {HOSTNAME}, {ENVIRONMENT}')
-        elif R3_LAST_STATE == 2:
-            status = 'Script Initializing'
-            print(f'[+] {event_time}, {status}, {R3_NAME}, {description}, Pin State = {r3_state}, {HOSTNAME}, {ENVIRONMENT}')
-            R3_LAST_STATE = r3_state
-    if r3_state == 0:
-        # Check last state to be sure this is a true event
-        description = 'Power is On'
-        R3_RED_LED.off()
-        R3_GREEN_LED.on()
-        if R3_LAST_STATE == 1:
-            # header(R3_NAME)
-            status = 'Success'
-            print(f'[+] {event_time}, {status}, {R3_NAME}, {description}, Pin State = {r3_state}, {HOSTNAME}, {ENVIRONMENT}')
-            publish_sns_alert(event_time, R3_NAME, status, description, r3_state)
-            R3_LAST_STATE = r3_state
-        elif R3_LAST_STATE == 0 and LOG_GHOSTS:
-            status = 'Ghost Trigger'
-            print(f'[-] {event_time}, {status}, {R3_NAME}, {description}, Pin State = {r3_state}, {HOSTNAME}, {ENVIRONMENT}')
-        elif R3_LAST_STATE == 2:
-            status = 'Script Initializing'
-            print(f'[+] {event_time}, {status}, {R3_NAME}, {description}, Pin State = {r3_state}, {HOSTNAME}, {ENVIRONMENT}')
-            R3_LAST_STATE = r3_state
+    transition = TRANSITIONS.get((rec.last, state))
+    if transition:
+        status, flag, action = transition
+        action(rec, state, leds, status, flag)
+
+
+def _apply_state(rec, state, leds, status, flag):
+    """ Relay changed state, update LEDs and last state then log it. """
+    event_time = event_stamp()
+    leds.set_values(rec.leds[state])
+    rec.last = state
+    write_line(rec.tmpl % (flag, event_time, status, DESCRIPTIONS[state], state))
+    return event_time
+
+
+def _alert(rec, state, leds, status, flag):
+    """ True power event, apply the new state then send an SNS alert. """
+    event_time = _apply_state(rec, state, leds, status, flag)
+    publish_sns_alert(event_time, rec.name, status, DESCRIPTIONS[state], state)
+
+
+def _ghost(rec, state, leds, status, flag):
+    """ Repeated state, LEDs already match so only log it. """
+    write_line(rec.tmpl % (flag, event_stamp(), status, DESCRIPTIONS[state], state))
+
+
+# (Last State, Pin State) -> (status, log flag, action) for edge events only. main()
+# seeds last state from its startup bulk read, so it is always 0 or 1 here.
+# Ghost Triggers map to None unless LOG_GHOSTS is set.
+TRANSITIONS = {
+    (0, 1): ('Failure', '[!]', _alert),
+    (1, 0): ('Success', '[+]', _alert),
+    (0, 0): ('Ghost Trigger', '[-]', _ghost) if LOG_GHOSTS else None,
+    (1, 1): ('Ghost Trigger', '[-]', _ghost) if LOG_GHOSTS else None,
+}
 
 
 def publish_sns_alert(event_time, relay_name, status, description, pin_state):
-    """ Sends SNS message to AWS when GPIO event is detected. """
+    """ Hands the alert to the SNS worker, main() flushes the queue at exit (up to SNS_DRAIN_WAIT). """
+    if SNS_ENABLE:
+        write_line(f'[+] {event_time}, Queueing {relay_name} alert for SNS topic {TOPIC_NAME}...\n')
+        _sns_queue.put_nowait((event_time, relay_name, status, description, pin_state))
+
+
+@functools.lru_cache(maxsize=1)
+def _sns_client():
+    """ SNS client, boto3 is only imported on the first alert and the client is reused. """
+    # A failure (no AWS profile or credentials, e.g. a dev box) is not cached, the next batch retries
+    import boto3
+    return boto3.Session(profile_name=PROFILE_NAME).client('sns')
+
+
+def _sns_entry(event_time, relay_name, status, description, pin_state):
+    """ Builds the PublishBatch entry for one alert. """
     # Message Payload
     message = f'{__project__} Notification'
     msg_attrs = {
         'eventTime': {
             'DataType': 'String',
-            'StringValue': str(event_time)
+            'StringValue': event_time
         },
         'relayName': {
             'DataType': 'String',
@@ -362,56 +393,103 @@ def publish_sns_alert(event_time, relay_name, status, description, pin_state):
             'StringValue': HOSTNAME
         }
     }
-
-    event_time = event_time = str(datetime.now().isoformat()).replace('T', ' ')
-    if SNS_ENABLE:
-        print(f'[+] {event_time}, Sending {relay_name} alert to SNS topic {TOPIC_NAME}...')
-        session = boto3.Session(profile_name=PROFILE_NAME)
-        client = session.client('sns')
-        response = client.publish(TopicArn=TOPIC_ARN,
-                               Message=message,
-                               MessageAttributes=msg_attrs)
-        print('[+] {}, SQS Response: {}'.format(event_time, response['ResponseMetadata']['HTTPStatusCode']))
+    return {'Id': str(next(_sns_ids)), 'Message': message, 'MessageAttributes': msg_attrs}
+
+
+def _sns_worker():
+    """ Background thread, publishes queued SNS alerts in batches of up to 10. """
+    stopping = False
+    while not stopping:
+        alert = _sns_queue.get()
+        if alert is _SNS_STOP:
+            break
+        batch = [alert]
+        # Hold briefly so an outage storm across relays goes out in one request
+        deadline = time.monotonic() + SNS_BATCH_WAIT
+        while len(batch) < SNS_BATCH_SIZE:
+            try:
+                alert = _sns_queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if alert is _SNS_STOP:
+                # Shutting down, send what is held now instead of waiting out the window
+                stopping = True
+                break
+            batch.append(alert)
+        entries = [_sns_entry(*alert) for alert in batch]
+        # Entry Id -> alert, so a rejected entry can be traced back to its relay event
+        by_id = {entry['Id']: alert for entry, alert in zip(entries, batch)}
+        event_time = event_stamp()
+        try:
+            response = _sns_client().publish_batch(TopicArn=TOPIC_ARN,
+                                                    PublishBatchRequestEntries=entries)
+            failed = response.get('Failed', [])
+            write_line('[+] {}, SNS Response: {}, Sent = {}, Failed = {}\n'.format(
+                event_time, response['ResponseMetadata']['HTTPStatusCode'],
+                len(response.get('Successful', [])), len(failed)))
+            for fail in failed:
+                alert_time, relay_name, status = by_id.get(fail['Id'], ('?', '?', '?'))[:3]
+                write_line(f'[-] {event_time}, SNS alert not sent, {relay_name}, {status}, Event Time = {alert_time}, '
+                           f'Id = {fail["Id"]}, Code = {fail.get("Code")}, Message = {fail.get("Message")}\n')
+        except Exception as ex:
+            write_line(f'[-] {event_time}, SNS publish failed for {len(batch)} alert(s): {ex}\n')
+
+
+@functools.lru_cache(maxsize=1)
+def _sec_stamp(secs):
+    """ Local time for epoch seconds, cached so events in the same second skip strftime. """
+    return time.strftime(TIME_FMT, time.localtime(secs))
+
+
+def event_stamp():
+    """ Current time as 'YYYY-MM-DD HH:MM:SS.mmm' for logs and alerts. """
+    secs, msecs = divmod(time.time_ns() // 1000000, 1000)
+    return f'{_sec_stamp(secs)}.{msecs:03d}'
+
+
+def write_line(line):
+    """ Writes a finished log line straight to the stdout fd, skips print's lock and encoder.
+        Once the SNS worker runs, every thread logs through here so each line is one write. """
+    sys.stdout.flush()  # Startup print() output goes out first, keeps log order
+    os.write(sys.stdout.fileno(), line.encode())
 
 
 def header(note):
     """ Standardized quick header. """
-    print('[+] --- ' + note + ' ' + ('-' * ((79-9)-len(note))))
+    write_line('[+] --- ' + note + ' ' + ('-' * ((79-9)-len(note))) + '\n')
 
 
 def remove_old_data(dir_name, days_back=90):
     """ Deletes files older than X days from supplied directory. """
-    purge_time = time.time()-(int(days_back) * 86400)
-    for curr_dir, _, files in os.walk(dir_name):
-        for file_name in files:
-            if os.path.isfile(os.path.join(curr_dir, file_name)):
-                m_time = os.path.getmtime(os.path.join(curr_dir, file_name))
-                if m_time < purge_time:
-                    try:
-                        print(f'[+] Expunge {dir_name} data older than {days_back} days...')
-                        os.remove(os.path.join(curr_dir, file_name))
-                        print('[+] Deleted {}'.format(os.path.join(curr_dir, file_name)))
-                    except Exception as ex:
-                        print(f'[-] {ex}')
+    purge_time = time.time()-(days_back * 86400)
+    print(f'[+] Expunge {dir_name} data older than {days_back} days...')
+    # Logs live in one flat directory, a single scandir pass is all that's needed.
+    # DirEntry caches the stat from the directory read, one syscall per file.
+    with os.scandir(dir_name) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < purge_time:
+                try:
+                    os.remove(entry.path)
+                    print('[+] Deleted {}'.format(entry.path))
+                except Exception as ex:
+                    print(f'[-] {ex}')
 
 
 if __name__ == '__main__':
     # Basic file system maintenance
-    if not os.path.exists(LOG_PATH):
-        os.makedirs(LOG_PATH)
-    if not os.path.exists(ETC_PATH):
-        os.makedirs(ETC_PATH)
+    os.makedirs(LOG_PATH, exist_ok=True)
+    os.makedirs(ETC_PATH, exist_ok=True)
     remove_old_data(LOG_PATH, RETENTION_DAYS)
 
     if USE_LOG:
         # Allow all STDOUT/STDERR to be redirected to log files instead of the console.
         SAVE_STD_OUT = sys.stdout
         SAVE_STD_ERR = sys.stderr
-        LOG_WRITE = open(LOG_FILE, 'w')
-        ERR_WRITE = open(ERR_FILE, 'w')
+        # Line buffered so background writes still land in the logs as they happen
+        LOG_WRITE = open(LOG_FILE, 'w', buffering=1)
+        ERR_WRITE = open(ERR_FILE, 'w', buffering=1)
         sys.stdout = LOG_WRITE
         sys.stderr = ERR_WRITE
-        print = functools.partial(print, flush=True)
         # Logged MAIN
         main()
         # Clean up logging if used.